@@ -0,0 +1,49 @@
+import os
+import random
+import pickle
+import numpy as np
+
+# Kept apart from ai_model.py so the web app can predict without loading
+# pandas and the training-only parts of scikit-learn
+MODEL_PATH = 'static/ai_model.pkl'
+
+def load_model(path=MODEL_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+def predict_category(model_data, user_data):
+    # Extract features (similar to training)
+    # We need to handle missing data or new categories gracefully
+    degree = user_data.get('degree', 'None')
+    experience = int(user_data.get('experience', 0))
+    # For skills, we might need to pick one or process list. 
+    # For this demo, we take the first skill or 'Python' default
+    skills = user_data.get('skills', 'Python')
+    primary_skill = skills.split(',')[0].strip() if ',' in skills else skills
+    prev_job = user_data.get('last_job', 'Intern')
+
+    # Helper to safely transform with fallback
+    def safe_transform(encoder, value):
+        if value in encoder.classes_:
+            return encoder.transform([value])[0]
+        else:
+            # Fallback to a random class or specific 'unknown' if trained
+            return random.choice(range(len(encoder.classes_)))
+
+    degree_encoded = safe_transform(model_data['le_degree'], degree)
+    skill_encoded = safe_transform(model_data['le_skill'], primary_skill)
+    job_encoded = safe_transform(model_data['le_job'], prev_job)
+    
+    # Normalize experience
+    exp_array = np.array([[experience]])
+    experience_scaled = model_data['scaler'].transform(exp_array)[0][0]
+    
+    # Prepare input vector
+    # Order: degree, experience, skill, job
+    features = np.array([[degree_encoded, experience_scaled, skill_encoded, job_encoded]])
+    
+    # Predict
+    prediction_index = model_data['model'].predict(features)[0]
+    return model_data['le_target'].inverse_transform([prediction_index])[0]
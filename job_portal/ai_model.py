@@ -5,14 +5,12 @@ from sklearn.neural_network import MLPClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.metrics import confusion_matrix, accuracy_score, log_loss
-import matplotlib.pyplot as plt
-import seaborn as sns
 import random
 import pickle
+import tempfile
+from ai_inference import MODEL_PATH
 
-# Ensure directories exist
-if not os.path.exists('static/ai_reports'):
-    os.makedirs('static/ai_reports')
+REPORTS_DIR = 'static/ai_reports'
 
 # --- 1. Data Simulation ---
 def generate_synthetic_data(num_samples=1000):
@@ -63,103 +61,148 @@ def generate_synthetic_data(num_samples=1000):
         
     return pd.DataFrame(data)
 
-print("Generating synthetic data...")
-df = generate_synthetic_data(2000)
-
 # --- 2. Preprocessing ---
-print("Preprocessing data...")
-# Encode categorical variables
-le_degree = LabelEncoder()
-le_skill = LabelEncoder()
-le_job = LabelEncoder()
-le_target = LabelEncoder()
+def preprocess(df):
+    print("Preprocessing data...")
+    # Encode categorical variables
+    le_degree = LabelEncoder()
+    le_skill = LabelEncoder()
+    le_job = LabelEncoder()
+    le_target = LabelEncoder()
+
+    df['degree_encoded'] = le_degree.fit_transform(df['degree'])
+    df['skill_encoded'] = le_skill.fit_transform(df['primary_skill'])
+    df['job_encoded'] = le_job.fit_transform(df['prev_job'])
+    df['target_encoded'] = le_target.fit_transform(df['target_category'])
+
+    # Features and Target
+    X = df[['degree_encoded', 'experience', 'skill_encoded', 'job_encoded']]
+    y = df['target_encoded']
+
+    # Normalize numerical features (experience)
+    scaler = StandardScaler()
+    X['experience'] = scaler.fit_transform(X[['experience']])
+
+    encoders = {
+        'le_degree': le_degree,
+        'le_skill': le_skill,
+        'le_job': le_job,
+        'le_target': le_target,
+        'scaler': scaler
+    }
+    return X, y, encoders
 
-df['degree_encoded'] = le_degree.fit_transform(df['degree'])
-df['skill_encoded'] = le_skill.fit_transform(df['primary_skill'])
-df['job_encoded'] = le_job.fit_transform(df['prev_job'])
-df['target_encoded'] = le_target.fit_transform(df['target_category'])
+# --- 3. Model Architecture (MLP) ---
+def build_model():
+    print("Building and training model (Scikit-learn MLP)...")
+    # MLPClassifier with 2 hidden layers (64, 32 neurons)
+    return MLPClassifier(hidden_layer_sizes=(64, 32), 
+                         activation='relu', 
+                         solver='adam', 
+                         max_iter=50, 
+                         random_state=42,
+                         verbose=True)
 
-# Features and Target
-X = df[['degree_encoded', 'experience', 'skill_encoded', 'job_encoded']]
-y = df['target_encoded']
+# --- 5. Visualization & Evaluation ---
+def render_reports(clf, le_target, X_train, X_test, y_train, y_test, reports_dir=REPORTS_DIR):
+    # Plotting libraries are heavy, only load them when reports are rendered
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    # Ensure directories exist
+    if not os.path.exists(reports_dir):
+        os.makedirs(reports_dir)
+
+    print("Generating reports...")
+
+    # Plot Loss Curve
+    plt.figure(figsize=(10, 6))
+    plt.plot(clf.loss_curve_)
+    plt.title('Model Loss over Iterations')
+    plt.xlabel('Iteration')
+    plt.ylabel('Loss')
+    plt.savefig(os.path.join(reports_dir, 'loss_plot.png'))
+    plt.close()
+
+    # Accuracy is not tracked per epoch by default in sklearn MLP, but we can score the final model
+    train_acc = clf.score(X_train, y_train)
+    test_acc = clf.score(X_test, y_test)
+    print(f"Final Training Accuracy: {train_acc:.4f}")
+    print(f"Final Test Accuracy: {test_acc:.4f}")
+
+    # Create a bar chart for accuracy comparison
+    plt.figure(figsize=(6, 6))
+    plt.bar(['Training', 'Testing'], [train_acc, test_acc], color=['blue', 'green'])
+    plt.ylim(0, 1)
+    plt.title('Final Model Accuracy')
+    plt.ylabel('Accuracy')
+    plt.savefig(os.path.join(reports_dir, 'accuracy_plot.png'))
+    plt.close()
+
+    # Confusion Matrix
+    y_pred = clf.predict(X_test)
+    cm = confusion_matrix(y_test, y_pred)
+
+    plt.figure(figsize=(10, 8))
+    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', 
+                xticklabels=le_target.classes_, 
+                yticklabels=le_target.classes_)
+    plt.title('Confusion Matrix')
+    plt.xlabel('Predicted')
+    plt.ylabel('Actual')
+    plt.savefig(os.path.join(reports_dir, 'confusion_matrix.png'))
+    plt.close()
+
+    print(f"Training complete. Reports saved in {reports_dir}/")
+    return {'train_accuracy': train_acc, 'test_accuracy': test_acc}
+
+# --- 6. Save Model ---
+def save_model(clf, encoders, path=MODEL_PATH):
+    print("Saving model...")
+    model_data = {'model': clf}
+    model_data.update(encoders)
+
+    # Write to a unique temp file first so readers never see a half-written
+    # pickle, even if two trainings overlap
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(model_data, f)
+        # mkstemp creates the file as 0600, keep the model readable by the web app
+        mode = os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+    print(f"Model saved to {path}")
+    return model_data
+
+def train_model(num_samples=2000, model_path=MODEL_PATH, reports_dir=REPORTS_DIR):
+    """
+    Runs the full pipeline: data simulation, training, reports and saving.
+    Called by the background worker (see worker.py) or by running this file directly.
+    """
+    print("Generating synthetic data...")
+    df = generate_synthetic_data(num_samples)
+    X, y, encoders = preprocess(df)
 
-# Normalize numerical features (experience)
-scaler = StandardScaler()
-X['experience'] = scaler.fit_transform(X[['experience']])
+    # Split data
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-# Split data
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    clf = build_model()
 
-# --- 3. Model Architecture (MLP) ---
-print("Building and training model (Scikit-learn MLP)...")
-# MLPClassifier with 2 hidden layers (64, 32 neurons)
-clf = MLPClassifier(hidden_layer_sizes=(64, 32), 
-                    activation='relu', 
-                    solver='adam', 
-                    max_iter=50, 
-                    random_state=42,
-                    verbose=True)
-
-# --- 4. Training ---
-# Scikit-learn's fit doesn't return history per epoch in the same way Keras does for plotting easily 
-# without partial_fit, but MLPClassifier has loss_curve_
-clf.fit(X_train, y_train)
+    # --- 4. Training ---
+    # Scikit-learn's fit doesn't return history per epoch in the same way Keras does for plotting easily 
+    # without partial_fit, but MLPClassifier has loss_curve_
+    clf.fit(X_train, y_train)
 
-# --- 5. Visualization & Evaluation ---
-print("Generating reports...")
-
-# Plot Loss Curve
-plt.figure(figsize=(10, 6))
-plt.plot(clf.loss_curve_)
-plt.title('Model Loss over Iterations')
-plt.xlabel('Iteration')
-plt.ylabel('Loss')
-plt.savefig('static/ai_reports/loss_plot.png')
-plt.close()
-
-# Accuracy is not tracked per epoch by default in sklearn MLP, but we can score the final model
-train_acc = clf.score(X_train, y_train)
-test_acc = clf.score(X_test, y_test)
-print(f"Final Training Accuracy: {train_acc:.4f}")
-print(f"Final Test Accuracy: {test_acc:.4f}")
-
-# Create a bar chart for accuracy comparison
-plt.figure(figsize=(6, 6))
-plt.bar(['Training', 'Testing'], [train_acc, test_acc], color=['blue', 'green'])
-plt.ylim(0, 1)
-plt.title('Final Model Accuracy')
-plt.ylabel('Accuracy')
-plt.savefig('static/ai_reports/accuracy_plot.png')
-plt.close()
-
-# Confusion Matrix
-y_pred = clf.predict(X_test)
-cm = confusion_matrix(y_test, y_pred)
-
-plt.figure(figsize=(10, 8))
-sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', 
-            xticklabels=le_target.classes_, 
-            yticklabels=le_target.classes_)
-plt.title('Confusion Matrix')
-plt.xlabel('Predicted')
-plt.ylabel('Actual')
-plt.savefig('static/ai_reports/confusion_matrix.png')
-plt.close()
-
-print("Training complete. Reports saved in static/ai_reports/")
+    metrics = render_reports(clf, encoders['le_target'], X_train, X_test, y_train, y_test, reports_dir)
+    save_model(clf, encoders, model_path)
+    return metrics
 
-# --- 6. Save Model ---
-print("Saving model...")
-model_data = {
-    'model': clf,
-    'le_degree': le_degree,
-    'le_skill': le_skill,
-    'le_job': le_job,
-    'le_target': le_target,
-    'scaler': scaler
-}
-
-with open('static/ai_model.pkl', 'wb') as f:
-    pickle.dump(model_data, f)
-
-print("Model saved to static/ai_model.pkl")
+if __name__ == '__main__':
+    train_model()
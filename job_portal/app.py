@@ -3,9 +3,8 @@ from db import get_db
 from utils import encrypt_password, decrypt_password, generate_keys
 from bson.objectid import ObjectId
 import datetime
-import pickle
-import numpy as np
-import os
+from ai_inference import load_model, predict_category
+import job_queue
 
 app = Flask(__name__)
 app.secret_key = 'super_secret_key'  # Change this in production
@@ -15,12 +14,17 @@ generate_keys()
 
 db = get_db()
 
+# Job queue indexes (also created by worker.py), the app can start without Mongo
+try:
+    job_queue.ensure_indexes(db)
+except Exception as e:
+    print(f"Error creating job queue indexes: {e}")
+
 # Load AI Model
 ai_model_data = None
 try:
-    if os.path.exists('static/ai_model.pkl'):
-        with open('static/ai_model.pkl', 'rb') as f:
-            ai_model_data = pickle.load(f)
+    ai_model_data = load_model()
+    if ai_model_data:
         print("AI Model loaded successfully.")
     else:
         print("AI Model not found.")
@@ -28,48 +32,15 @@ except Exception as e:
     print(f"Error loading AI model: {e}")
 
 def get_ai_recommendation(user_data):
+    # Prefer the value precomputed by the background worker
+    if user_data.get('ai_recommendation'):
+        return user_data['ai_recommendation']
+
     if not ai_model_data:
         return None
         
     try:
-        # Extract features (similar to training)
-        # We need to handle missing data or new categories gracefully
-        degree = user_data.get('degree', 'None')
-        experience = int(user_data.get('experience', 0))
-        # For skills, we might need to pick one or process list. 
-        # For this demo, we take the first skill or 'Python' default
-        skills = user_data.get('skills', 'Python')
-        primary_skill = skills.split(',')[0].strip() if ',' in skills else skills
-        prev_job = user_data.get('last_job', 'Intern')
-
-        # Helper to safely transform with fallback
-        def safe_transform(encoder, value):
-            if value in encoder.classes_:
-                return encoder.transform([value])[0]
-            else:
-                # Fallback to a random class or specific 'unknown' if trained
-                return random.choice(range(len(encoder.classes_)))
-        
-        # We need random for fallback
-        import random
-
-        degree_encoded = safe_transform(ai_model_data['le_degree'], degree)
-        skill_encoded = safe_transform(ai_model_data['le_skill'], primary_skill)
-        job_encoded = safe_transform(ai_model_data['le_job'], prev_job)
-        
-        # Normalize experience
-        exp_array = np.array([[experience]])
-        experience_scaled = ai_model_data['scaler'].transform(exp_array)[0][0]
-        
-        # Prepare input vector
-        # Order: degree, experience, skill, job
-        features = np.array([[degree_encoded, experience_scaled, skill_encoded, job_encoded]])
-        
-        # Predict
-        prediction_index = ai_model_data['model'].predict(features)[0]
-        recommendation = ai_model_data['le_target'].inverse_transform([prediction_index])[0]
-        
-        return recommendation
+        return predict_category(ai_model_data, user_data)
     except Exception as e:
         print(f"Error in AI recommendation: {e}")
         return None
@@ -130,6 +101,8 @@ def login(user_type):
 def register(user_type):
     if request.method == 'POST':
         data = request.form.to_dict()
+        # Only the background worker may set this
+        data.pop('ai_recommendation', None)
         email = data['email']
         password = data['password']
         
@@ -153,7 +126,16 @@ def register(user_type):
         elif db[collection_name].find_one({'email': email}):
             flash('El correo ya está registrado')
         else:
-            db[collection_name].insert_one(data)
+            user_id = db[collection_name].insert_one(data).inserted_id
+            if user_type in ('seeker', 'student'):
+                # Compute the recommendation off the request path (see worker.py).
+                # The dashboard falls back to inline prediction if this fails
+                try:
+                    job_queue.enqueue(db, 'refresh_recommendations',
+                                      {'collection': collection_name, 'user_id': str(user_id)},
+                                      priority=10, dedupe_key=str(user_id))
+                except Exception as e:
+                    print(f"Error enqueuing AI recommendation: {e}")
             flash('¡Registro exitoso! Por favor inicia sesión.')
             return redirect(url_for('login', user_type=user_type))
             
@@ -2,20 +2,24 @@ import zipfile
 import xml.etree.ElementTree as ET
 import sys
 
+def read_docx_text(path):
+    # Raises on unreadable files, used by the background worker
+    document = zipfile.ZipFile(path)
+    xml_content = document.read('word/document.xml')
+    document.close()
+    tree = ET.XML(xml_content)
+    
+    paragraphs = []
+    for paragraph in tree.iter('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}p'):
+        texts = [node.text for node in paragraph.iter('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t') if node.text]
+        if texts:
+            paragraphs.append(''.join(texts))
+            
+    return '\n'.join(paragraphs)
+
 def get_docx_text(path):
     try:
-        document = zipfile.ZipFile(path)
-        xml_content = document.read('word/document.xml')
-        document.close()
-        tree = ET.XML(xml_content)
-        
-        paragraphs = []
-        for paragraph in tree.iter('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}p'):
-            texts = [node.text for node in paragraph.iter('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t') if node.text]
-            if texts:
-                paragraphs.append(''.join(texts))
-                
-        return '\n'.join(paragraphs)
+        return read_docx_text(path)
     except Exception as e:
         return f"Error reading .docx file: {e}"
 
@@ -0,0 +1,169 @@
+import datetime
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+# Jobs live in a plain Mongo collection, so no external broker is needed.
+# A job moves queued -> running -> done, or back to queued (with backoff)
+# when it fails, until it runs out of attempts and ends up as failed.
+JOBS_COLLECTION = 'jobs'
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+BACKOFF_BASE_SECONDS = 10
+BACKOFF_MAX_SECONDS = 600
+
+def _now():
+    return datetime.datetime.utcnow()
+
+def ensure_indexes(db):
+    jobs = db[JOBS_COLLECTION]
+    # Used by claim_job to pick the next runnable job
+    jobs.create_index([('status', ASCENDING), ('priority', DESCENDING), ('run_at', ASCENDING)])
+    jobs.create_index([('status', ASCENDING), ('lease_until', ASCENDING)])
+    # Only queued jobs carry active_key (claim_job drops it, fail_job restores
+    # it on retry from dedupe_key), so a running or finished job does not block
+    # the same work from being enqueued again
+    jobs.create_index('active_key', unique=True,
+                      partialFilterExpression={'active_key': {'$exists': True}})
+
+def enqueue(db, job_type, payload=None, priority=0, dedupe_key=None,
+            max_attempts=DEFAULT_MAX_ATTEMPTS, delay_seconds=0):
+    """
+    Adds a job to the queue and returns its id.
+    Higher priority jobs are claimed first. If dedupe_key is given and a job
+    with the same key is still queued (not yet claimed), that job's id is
+    returned instead. This includes a failed job waiting out its backoff.
+    A job that is already running never absorbs a new one, since it may have
+    started from stale inputs.
+    """
+    now = _now()
+    job = {
+        'type': job_type,
+        'payload': payload or {},
+        'status': STATUS_QUEUED,
+        'priority': priority,
+        'attempts': 0,
+        'max_attempts': max_attempts,
+        'run_at': now + datetime.timedelta(seconds=delay_seconds),
+        'lease_until': None,
+        'worker': None,
+        'error': None,
+        'result': None,
+        'created_at': now,
+        'updated_at': now
+    }
+    if dedupe_key:
+        job['dedupe_key'] = f"{job_type}:{dedupe_key}"
+        job['active_key'] = job['dedupe_key']
+
+    while True:
+        try:
+            return db[JOBS_COLLECTION].insert_one(job).inserted_id
+        except DuplicateKeyError:
+            existing = db[JOBS_COLLECTION].find_one({'active_key': job['active_key']})
+            if existing:
+                return existing['_id']
+            # The other job was claimed between our insert and lookup, try again
+            job.pop('_id', None)
+
+def claim_job(db, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """
+    Atomically takes the next runnable job and leases it to worker_id.
+    Running jobs whose lease expired (e.g. the worker crashed) are picked up again.
+    Returns the job document or None when there is nothing to do.
+    """
+    now = _now()
+    return db[JOBS_COLLECTION].find_one_and_update(
+        {'$or': [
+            {'status': STATUS_QUEUED, 'run_at': {'$lte': now}},
+            {'status': STATUS_RUNNING, 'lease_until': {'$lt': now}}
+        ]},
+        {
+            '$set': {
+                'status': STATUS_RUNNING,
+                'worker': worker_id,
+                'lease_until': now + datetime.timedelta(seconds=lease_seconds),
+                'started_at': now,
+                'updated_at': now
+            },
+            # Once claimed the job no longer dedupes new enqueues
+            '$unset': {'active_key': ''},
+            '$inc': {'attempts': 1}
+        },
+        sort=[('priority', DESCENDING), ('run_at', ASCENDING)],
+        return_document=ReturnDocument.AFTER
+    )
+
+def extend_lease(db, job_id, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+    # Returns False if the lease was lost to another worker
+    now = _now()
+    result = db[JOBS_COLLECTION].update_one(
+        {'_id': job_id, 'worker': worker_id, 'status': STATUS_RUNNING},
+        {'$set': {'lease_until': now + datetime.timedelta(seconds=lease_seconds),
+                  'updated_at': now}}
+    )
+    return result.modified_count == 1
+
+def complete_job(db, job_id, worker_id, result=None):
+    now = _now()
+    db[JOBS_COLLECTION].update_one(
+        {'_id': job_id, 'worker': worker_id, 'status': STATUS_RUNNING},
+        {
+            '$set': {
+                'status': STATUS_DONE,
+                'result': result,
+                'error': None,
+                'lease_until': None,
+                'finished_at': now,
+                'updated_at': now
+            }
+        }
+    )
+
+def backoff_seconds(attempts):
+    # Exponential backoff: 10s, 20s, 40s, ... capped at BACKOFF_MAX_SECONDS
+    return min(BACKOFF_BASE_SECONDS * (2 ** max(attempts - 1, 0)), BACKOFF_MAX_SECONDS)
+
+def fail_job(db, job, worker_id, error):
+    """
+    Records a failed attempt. The job is re-queued with backoff while it has
+    attempts left, otherwise it is marked as failed for good. A retry whose
+    dedupe key was taken by a newer queued job is marked done as superseded,
+    the newer job does the work instead.
+    """
+    now = _now()
+    update = {
+        '$set': {
+            'error': str(error),
+            'lease_until': None,
+            'updated_at': now
+        }
+    }
+    retry = job['attempts'] < job['max_attempts']
+    if retry:
+        update['$set']['status'] = STATUS_QUEUED
+        update['$set']['run_at'] = now + datetime.timedelta(seconds=backoff_seconds(job['attempts']))
+        if job.get('dedupe_key'):
+            update['$set']['active_key'] = job['dedupe_key']
+    else:
+        update['$set']['status'] = STATUS_FAILED
+        update['$set']['finished_at'] = now
+
+    query = {'_id': job['_id'], 'worker': worker_id, 'status': STATUS_RUNNING}
+    try:
+        db[JOBS_COLLECTION].update_one(query, update)
+    except DuplicateKeyError:
+        newer = db[JOBS_COLLECTION].find_one({'active_key': job['dedupe_key']})
+        del update['$set']['active_key']
+        update['$set']['status'] = STATUS_DONE
+        update['$set']['finished_at'] = now
+        update['$set']['result'] = {'superseded_by': newer['_id'] if newer else None}
+        db[JOBS_COLLECTION].update_one(query, update)
+
+def get_job(db, job_id):
+    return db[JOBS_COLLECTION].find_one({'_id': job_id})
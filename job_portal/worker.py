@@ -0,0 +1,198 @@
+import argparse
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+from bson.objectid import ObjectId
+from db import get_db
+import job_queue
+
+POLL_INTERVAL_SECONDS = 2
+ERROR_SLEEP_SECONDS = 10
+DEFAULT_PROCESSES = 2
+
+# --- Job handlers ---
+# Each handler receives (db, payload) and returns a small result dict that is
+# stored on the job document. Raising an exception triggers a retry.
+
+def handle_train_model(db, payload):
+    # Heavy imports stay inside the handler so idle workers start quickly
+    import ai_model
+    metrics = ai_model.train_model(num_samples=payload.get('num_samples', 2000))
+    # Cached recommendations were computed with the old model. A refresh that is
+    # already running may have loaded the old pickle, so this always queues a new one
+    for collection_name in ('seekers', 'students'):
+        job_queue.enqueue(db, 'refresh_recommendations', {'collection': collection_name},
+                          dedupe_key=collection_name)
+    return metrics
+
+def handle_extract_resume(db, payload):
+    from extract_text import read_docx_text
+    text = read_docx_text(payload['path'])
+
+    if payload.get('collection') and payload.get('user_id'):
+        db[payload['collection']].update_one(
+            {'_id': ObjectId(payload['user_id'])},
+            {'$set': {'resume_text': text}}
+        )
+    return {'characters': len(text)}
+
+def handle_refresh_recommendations(db, payload):
+    from ai_inference import load_model, predict_category
+    model_data = load_model()
+    if not model_data:
+        raise RuntimeError('AI model not found')
+
+    collection = db[payload['collection']]
+    query = {}
+    if payload.get('user_id'):
+        query['_id'] = ObjectId(payload['user_id'])
+
+    updated = 0
+    failed = 0
+    for user in collection.find(query):
+        # One bad profile (e.g. non-numeric experience) must not stop the rest
+        try:
+            recommendation = predict_category(model_data, user)
+        except Exception as e:
+            print(f"Error in AI recommendation for {user['_id']}: {e}")
+            failed += 1
+            continue
+        collection.update_one({'_id': user['_id']}, {'$set': {'ai_recommendation': recommendation}})
+        updated += 1
+    return {'updated': updated, 'failed': failed}
+
+HANDLERS = {
+    'train_model': handle_train_model,
+    'extract_resume': handle_extract_resume,
+    'refresh_recommendations': handle_refresh_recommendations
+}
+
+# --- Worker loop ---
+
+def _keep_lease(db, job_id, worker_id, lease_seconds, stop_event):
+    # Renews the lease while a long job (e.g. training) is still running
+    while not stop_event.wait(lease_seconds / 3):
+        try:
+            if not job_queue.extend_lease(db, job_id, worker_id, lease_seconds):
+                break
+        except Exception as e:
+            # Keep trying on the next tick, the lease has some slack left
+            print(f"[{worker_id}] Error extending lease for job {job_id}: {e}")
+
+def run_job(db, job, worker_id, lease_seconds):
+    handler = HANDLERS.get(job['type'])
+    if handler is None:
+        job['attempts'] = job['max_attempts']  # Retrying will not help
+        job_queue.fail_job(db, job, worker_id, f"Unknown job type: {job['type']}")
+        return
+
+    if job['attempts'] > job['max_attempts']:
+        # Lease expired on the last attempt, the worker probably crashed
+        job_queue.fail_job(db, job, worker_id, job.get('error') or 'Lease expired')
+        return
+
+    stop_event = threading.Event()
+    heartbeat = threading.Thread(target=_keep_lease,
+                                 args=(db, job['_id'], worker_id, lease_seconds, stop_event),
+                                 daemon=True)
+    heartbeat.start()
+    try:
+        try:
+            result = handler(db, job['payload'])
+        except Exception as e:
+            traceback.print_exc()
+            job_queue.fail_job(db, job, worker_id, e)
+            print(f"[{worker_id}] Job {job['_id']} ({job['type']}) failed: {e}")
+            return
+        # Not a handler failure if this raises, worker_loop logs it and the
+        # job is recovered once its lease expires
+        job_queue.complete_job(db, job['_id'], worker_id, result)
+        print(f"[{worker_id}] Job {job['_id']} ({job['type']}) done")
+    finally:
+        stop_event.set()
+        heartbeat.join()
+
+def worker_loop(index, lease_seconds=job_queue.DEFAULT_LEASE_SECONDS):
+    # Each process opens its own connection, MongoClient is not fork-safe
+    db = get_db()
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    print(f"[{worker_id}] Worker started")
+    while True:
+        try:
+            job = job_queue.claim_job(db, worker_id, lease_seconds)
+            if job is None:
+                time.sleep(POLL_INTERVAL_SECONDS)
+                continue
+            run_job(db, job, worker_id, lease_seconds)
+        except Exception as e:
+            # Usually a transient connection error, an unfinished job is
+            # picked up again once its lease expires
+            print(f"[{worker_id}] Worker error: {e}")
+            time.sleep(ERROR_SLEEP_SECONDS)
+
+def _start_worker(index):
+    p = multiprocessing.Process(target=worker_loop, args=(index,))
+    p.start()
+    return p
+
+def run_pool(processes=DEFAULT_PROCESSES):
+    job_queue.ensure_indexes(get_db())
+
+    workers = [_start_worker(index) for index in range(processes)]
+
+    try:
+        # Keep the pool at full size, restarting any worker that exits
+        while True:
+            for index, p in enumerate(workers):
+                if not p.is_alive():
+                    print(f"Worker {index} exited with code {p.exitcode}, restarting...")
+                    workers[index] = _start_worker(index)
+            time.sleep(POLL_INTERVAL_SECONDS)
+    except KeyboardInterrupt:
+        print("Stopping workers...")
+        for p in workers:
+            p.terminate()
+        for p in workers:
+            p.join()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Background job worker')
+    parser.add_argument('--processes', type=int, default=DEFAULT_PROCESSES,
+                        help='Number of worker processes')
+    parser.add_argument('--enqueue', choices=sorted(HANDLERS),
+                        help='Enqueue a job of this type and exit')
+    parser.add_argument('--path', help='Path of the .docx file for extract_resume')
+    parser.add_argument('--collection', choices=['seekers', 'students'],
+                        help='Collection of the user to store the extracted text on')
+    parser.add_argument('--user-id', help='Id of the user to store the extracted text on')
+    args = parser.parse_args()
+
+    if args.enqueue == 'train_model':
+        db = get_db()
+        job_queue.ensure_indexes(db)
+        print(f"Enqueued job {job_queue.enqueue(db, 'train_model', dedupe_key='train_model')}")
+    elif args.enqueue == 'refresh_recommendations':
+        db = get_db()
+        job_queue.ensure_indexes(db)
+        for collection_name in ('seekers', 'students'):
+            job_id = job_queue.enqueue(db, 'refresh_recommendations', {'collection': collection_name},
+                                       dedupe_key=collection_name)
+            print(f"Enqueued job {job_id}")
+    elif args.enqueue == 'extract_resume':
+        if not args.path:
+            parser.error('--path is required for extract_resume')
+        if bool(args.collection) != bool(args.user_id):
+            parser.error('--collection and --user-id must be given together')
+        db = get_db()
+        job_queue.ensure_indexes(db)
+        payload = {'path': os.path.abspath(args.path)}
+        if args.user_id:
+            payload['collection'] = args.collection
+            payload['user_id'] = args.user_id
+        job_id = job_queue.enqueue(db, 'extract_resume', payload, dedupe_key=payload['path'])
+        print(f"Enqueued job {job_id}")
+    else:
+        run_pool(args.processes)